@@ -2,6 +2,8 @@ import asyncio
 import logging
 import os
 
+import asyncpg
+import redis.asyncio as redis
 import twitchio
 from twitchio import eventsub
 from twitchio.ext import commands
@@ -9,6 +11,7 @@ from twitchio.web import AiohttpAdapter
 from aiohttp import web
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 
 load_dotenv()
 
@@ -21,6 +24,9 @@ OWNER_ID = os.getenv("TWITCH_OWNER_ID", "")
 CHANNEL = os.getenv("TWITCH_CHANNEL", "")
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL", "")
+SUPABASE_POOLER_URL = os.getenv("SUPABASE_POOLER_URL", "")
+REDIS_URL = os.getenv("REDIS_URL", "")
 PORT = int(os.getenv("PORT", "10000"))
 RENDER_URL = os.getenv("RENDER_URL", "")
 
@@ -39,8 +45,17 @@ class HealthCheckAdapter(AiohttpAdapter):
 
 
 class RaffleBot(commands.AutoBot):
-    def __init__(self, *, supabase_client: Client, subs: list[eventsub.SubscriptionPayload]) -> None:
+    def __init__(
+        self,
+        *,
+        supabase_client: Client,
+        subs: list[eventsub.SubscriptionPayload],
+        pg_pool: asyncpg.Pool | None = None,
+        redis_client: redis.Redis | None = None,
+    ) -> None:
         self.supabase = supabase_client
+        self.pg_pool = pg_pool
+        self.redis_client = redis_client
         
         adapter = HealthCheckAdapter(host="0.0.0.0", port=PORT, domain=RENDER_URL if RENDER_URL else None)
         
@@ -57,32 +72,37 @@ class RaffleBot(commands.AutoBot):
 
     async def setup_hook(self) -> None:
         from raffle import RaffleComponent
-        raffle_component = RaffleComponent(self, self.supabase)
-        await raffle_component.load_all_active_raffles()
-        await self.add_component(raffle_component)
-        LOGGER.info("Loaded RaffleComponent")
-        
+        raffle_component = RaffleComponent(
+            self, self.supabase, pg_pool=self.pg_pool, redis_client=self.redis_client
+        )
+
+        coros = [raffle_component.load_all_active_raffles()]
         if CHANNEL:
             LOGGER.info("Target channel: %s", CHANNEL)
-            await self._subscribe_to_channel(CHANNEL)
-    
-    async def _subscribe_to_channel(self, channel_name: str) -> None:
+            coros.append(self._subscribe_to_channels([CHANNEL]))
+        await asyncio.gather(*coros)
+
+        await self.add_component(raffle_component)
+        LOGGER.info("Loaded RaffleComponent")
+
+    async def _subscribe_to_channels(self, channel_names: list[str]) -> None:
         try:
-            users = await self.fetch_users(logins=[channel_name])
+            # Twitch resolves up to 100 logins per fetch_users call.
+            users = await self.fetch_users(logins=channel_names)
             if not users:
-                LOGGER.error("Could not find channel: %s", channel_name)
+                LOGGER.error("Could not find channels: %s", ", ".join(channel_names))
                 return
-            
-            channel_id = users[0].id
-            LOGGER.info("Found channel %s (ID: %s)", channel_name, channel_id)
-            
-            subs = [eventsub.ChatMessageSubscription(broadcaster_user_id=channel_id, user_id=self.bot_id)]
+
+            subs = [
+                eventsub.ChatMessageSubscription(broadcaster_user_id=user.id, user_id=self.bot_id)
+                for user in users
+            ]
             resp = await self.multi_subscribe(subs)
-            
+
             if resp.errors:
                 LOGGER.warning("Subscribe error: %r", resp.errors)
             else:
-                LOGGER.info("Subscribed to channel: %s", channel_name)
+                LOGGER.info("Subscribed to %d channel(s): %s", len(users), ", ".join(u.name or u.id for u in users))
         except Exception as e:
             LOGGER.error("Error: %s", e)
 
@@ -102,11 +122,13 @@ class RaffleBot(commands.AutoBot):
         resp = await super().add_token(token, refresh)
 
         try:
-            self.supabase.table("twitch_tokens").upsert({
-                "user_id": resp.user_id,
-                "token": token,
-                "refresh": refresh
-            }, on_conflict="user_id").execute()
+            await asyncio.to_thread(
+                lambda: self.supabase.table("twitch_tokens").upsert({
+                    "user_id": resp.user_id,
+                    "token": token,
+                    "refresh": refresh
+                }, on_conflict="user_id").execute()
+            )
             LOGGER.info("Saved token for user: %s", resp.user_id)
         except Exception as e:
             LOGGER.error("Failed to save token: %s", e)
@@ -117,18 +139,22 @@ class RaffleBot(commands.AutoBot):
         LOGGER.info("Bot ready! ID: %s, Channel: %s, Port: %s", self.bot_id, CHANNEL, PORT)
 
 
-def load_tokens(supabase: Client) -> tuple[list[tuple[str, str]], list[eventsub.SubscriptionPayload]]:
+async def load_tokens(supabase: Client) -> tuple[list[tuple[str, str]], list[eventsub.SubscriptionPayload]]:
     tokens = []
     subs = []
 
     try:
-        result = supabase.table("twitch_tokens").select("*").execute()
-        
-        for row in result.data:
-            tokens.append((row["token"], row["refresh"]))
-            if row["user_id"] != BOT_ID:
-                subs.append(eventsub.ChatMessageSubscription(broadcaster_user_id=row["user_id"], user_id=BOT_ID))
-        
+        result = await asyncio.to_thread(
+            lambda: supabase.table("twitch_tokens").select("user_id,token,refresh").execute()
+        )
+
+        tokens = [(row["token"], row["refresh"]) for row in result.data]
+        subs = [
+            eventsub.ChatMessageSubscription(broadcaster_user_id=row["user_id"], user_id=BOT_ID)
+            for row in result.data
+            if row["user_id"] != BOT_ID
+        ]
+
         LOGGER.info("Loaded %d tokens", len(tokens))
     except Exception as e:
         LOGGER.warning("Could not load tokens: %s", e)
@@ -137,6 +163,12 @@ def load_tokens(supabase: Client) -> tuple[list[tuple[str, str]], list[eventsub.
 
 
 def main() -> None:
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     if not all([CLIENT_ID, CLIENT_SECRET, BOT_ID, OWNER_ID]):
         print("ERROR: Missing Twitch environment variables!")
         return
@@ -148,16 +180,48 @@ def main() -> None:
     twitchio.utils.setup_logging(level=logging.INFO)
     LOGGER.info("Starting bot on 0.0.0.0:%s", PORT)
 
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    # One client for the bot lifetime: postgrest reuses a single keep-alive
+    # httpx session underneath, so every .execute() shares warm connections.
+    supabase = create_client(
+        SUPABASE_URL, SUPABASE_KEY,
+        options=ClientOptions(postgrest_client_timeout=10),
+    )
     LOGGER.info("Connected to Supabase")
 
-    tokens, subs = load_tokens(supabase)
-
     async def runner() -> None:
-        async with RaffleBot(supabase_client=supabase, subs=subs) as bot:
-            for pair in tokens:
-                await bot.add_token(*pair)
-            await bot.start(load_tokens=False)
+        tokens, subs = await load_tokens(supabase)
+
+        pg_pool = None
+        db_url = SUPABASE_POOLER_URL or SUPABASE_DB_URL
+        if db_url:
+            # Supavisor's transaction pooler does not support prepared statements.
+            pg_pool = await asyncpg.create_pool(
+                db_url, min_size=2, max_size=10, statement_cache_size=0
+            )
+            LOGGER.info("Connected asyncpg pool to Postgres%s", " (pooler)" if SUPABASE_POOLER_URL else "")
+
+        redis_client = None
+        if REDIS_URL:
+            redis_client = redis.from_url(REDIS_URL)
+            LOGGER.info("Connected Redis client")
+
+        try:
+            async with RaffleBot(
+                supabase_client=supabase, subs=subs, pg_pool=pg_pool, redis_client=redis_client
+            ) as bot:
+                sem = asyncio.Semaphore(10)
+
+                async def _add_token(pair: tuple[str, str]) -> None:
+                    async with sem:
+                        await bot.add_token(*pair)
+
+                await asyncio.gather(*(_add_token(pair) for pair in tokens))
+                await bot.start(load_tokens=False)
+        finally:
+            if redis_client is not None:
+                await redis_client.aclose()
+            if pg_pool is not None:
+                await pg_pool.close()
 
     try:
         asyncio.run(runner())
@@ -1,85 +1,135 @@
+import asyncio
+import itertools
 import logging
 import secrets
+from collections import defaultdict
 from dataclasses import dataclass, field
 
+import asyncpg
+import redis.asyncio as redis
 import twitchio
 from twitchio.ext import commands
 from supabase import Client
 
 LOGGER = logging.getLogger("RaffleBot")
 
+# Cached once at import (after main() configures logging) so hot-path
+# saves skip logging's level/frame machinery when debug is off.
+_DEBUG = LOGGER.isEnabledFor(logging.DEBUG)
 
-@dataclass
+# Static replies on the chat hot path, hoisted so handlers reuse one
+# string object instead of rebuilding it per message.
+MSG_NO_RAFFLE = "There is no raffle happening right now."
+MSG_ENTRIES_CLOSED = "Raffle entries are closed."
+MSG_NOT_ELIGIBLE = "Only VIPs, Subscribers, and Moderators can join."
+MSG_RAFFLE_STARTED = "Raffle started! VIPs, Subscribers, and Moderators can type !enter to enter."
+MSG_NO_RAFFLE_STATUS = "No raffle happening."
+MSG_HELP = "Commands: !enter, !participants | Mods: !startraffle, !endraffle, !draw, !cancelraffle"
+
+
+@dataclass(slots=True)
 class RaffleState:
     is_active: bool = False
     is_open: bool = False
-    participants: set[str] = field(default_factory=set)
     participant_names: dict[str, str] = field(default_factory=dict)
 
     def reset(self) -> None:
         self.is_active = False
         self.is_open = False
-        self.participants.clear()
         self.participant_names.clear()
 
+    @property
+    def participant_count(self) -> int:
+        return len(self.participant_names)
+
     def add_participant(self, user_id: str, display_name: str) -> bool:
-        if user_id in self.participants:
+        if user_id in self.participant_names:
             return False
-        self.participants.add(user_id)
         self.participant_names[user_id] = display_name
         return True
 
     def draw_winner(self) -> str | None:
-        if not self.participants:
+        count = len(self.participant_names)
+        if not count:
             return None
-        winner_id = secrets.choice(list(self.participants))
+        idx = secrets.randbelow(count)
+        winner_id = next(itertools.islice(self.participant_names, idx, idx + 1))
         return self.participant_names.get(winner_id, "Unknown")
 
     def to_db_format(self) -> dict:
-        """Convert state to database-storable format."""
-        participants_list = [
-            {"user_id": uid, "display_name": name}
-            for uid, name in self.participant_names.items()
-        ]
+        """Convert raffle flags to database-storable format."""
         return {
             "is_active": self.is_active,
             "is_open": self.is_open,
-            "participants": participants_list,
         }
 
     @classmethod
-    def from_db_format(cls, data: dict) -> "RaffleState":
-        """Create RaffleState from database record."""
+    def from_db_format(cls, data: dict, participant_rows: list[dict] | None = None) -> "RaffleState":
+        """Create RaffleState from a raffles record plus its participant rows."""
         state = cls()
         state.is_active = data.get("is_active", False)
         state.is_open = data.get("is_open", False)
-        
-        participants_list = data.get("participants", [])
-        for p in participants_list:
-            state.participants.add(p["user_id"])
-            state.participant_names[p["user_id"]] = p["display_name"]
-        
+
+        if participant_rows:
+            state.participant_names = {p["user_id"]: p["display_name"] for p in participant_rows}
+
         return state
 
 
 class RaffleComponent(commands.Component):
-    def __init__(self, bot: commands.Bot, supabase: Client) -> None:
+    def __init__(
+        self,
+        bot: commands.Bot,
+        supabase: Client,
+        pg_pool: asyncpg.Pool | None = None,
+        redis_client: redis.Redis | None = None,
+    ) -> None:
         self.bot = bot
+        self._bot_id_str = str(bot.bot_id)
         self.supabase = supabase
+        self.pg_pool = pg_pool
+        self.redis = redis_client
         self.raffles: dict[str, RaffleState] = {}
+        self._dirty: dict[str, asyncio.Event] = {}
+        self._flush_tasks: dict[str, asyncio.Task] = {}
+        self._elig_cache: dict[str, dict[str, bool]] = {}
+        self._last_saved: dict[str, tuple[bool, bool]] = {}
+        self._save_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._pending_rows: dict[str, list[dict]] = {}
 
     async def load_all_active_raffles(self) -> None:
         """Load all active raffles from database on startup."""
         try:
-            result = self.supabase.table("raffles").select("*").eq("is_active", True).execute()
-            
+            result = await asyncio.to_thread(
+                lambda: self.supabase.table("raffles").select("*").eq("is_active", True).execute()
+            )
+
+            broadcaster_ids = [row["broadcaster_id"] for row in result.data]
+            participants_by_broadcaster: dict[str, list[dict]] = {}
+
+            if broadcaster_ids:
+                participants = await asyncio.to_thread(
+                    lambda: self.supabase.table("raffle_participants").select("*").in_(
+                        "broadcaster_id", broadcaster_ids
+                    ).execute()
+                )
+                for p in participants.data:
+                    participants_by_broadcaster.setdefault(p["broadcaster_id"], []).append(p)
+
             for row in result.data:
                 broadcaster_id = row["broadcaster_id"]
-                self.raffles[broadcaster_id] = RaffleState.from_db_format(row)
-                count = len(self.raffles[broadcaster_id].participants)
-                LOGGER.info("Loaded raffle for broadcaster %s with %d participants", broadcaster_id, count)
-            
-            LOGGER.info("Loaded %d active raffles from database", len(result.data))
+                rows = participants_by_broadcaster.get(broadcaster_id, [])
+                self.raffles[broadcaster_id] = RaffleState.from_db_format(row, rows)
+                if _DEBUG:
+                    LOGGER.debug(
+                        "Loaded raffle for broadcaster %s with %d participants",
+                        broadcaster_id, self.raffles[broadcaster_id].participant_count,
+                    )
+
+            LOGGER.info(
+                "Loaded %d active raffles (%d participants) from database",
+                len(result.data), sum(len(v) for v in participants_by_broadcaster.values()),
+            )
         except Exception as e:
             LOGGER.warning("Could not load raffles from database: %s", e)
 
@@ -89,34 +139,179 @@ class RaffleComponent(commands.Component):
         return self.raffles[broadcaster_id]
 
     async def save_raffle(self, broadcaster_id: str) -> None:
-        """Save raffle state to database."""
+        """Schedule a debounced save of raffle state to the database."""
+        if self.redis is not None:
+            raffle = self.raffles.get(broadcaster_id)
+            if raffle is not None:
+                try:
+                    await self.redis.hset(f"raffle:{broadcaster_id}", mapping={
+                        "is_active": int(raffle.is_active),
+                        "is_open": int(raffle.is_open),
+                    })
+                except Exception as e:
+                    LOGGER.error("Failed to save raffle state to Redis: %s", e)
+
+        self._mark_dirty(broadcaster_id)
+
+    def _mark_dirty(self, broadcaster_id: str) -> None:
+        event = self._dirty.setdefault(broadcaster_id, asyncio.Event())
+        event.set()
+
+        task = self._flush_tasks.get(broadcaster_id)
+        if task is None or task.done():
+            self._flush_tasks[broadcaster_id] = asyncio.create_task(self._flusher(broadcaster_id))
+
+    async def _flusher(self, broadcaster_id: str) -> None:
+        """Coalesce bursts of saves into a single database write."""
+        event = self._dirty[broadcaster_id]
+        while event.is_set():
+            await asyncio.sleep(0.5)
+            event.clear()
+            await self._flush_raffle(broadcaster_id)
+
+    async def _flush_raffle(self, broadcaster_id: str) -> None:
+        """Write raffle state to database."""
         raffle = self.raffles.get(broadcaster_id)
         if not raffle:
             return
-        
+
+        async with self._save_locks[broadcaster_id]:
+            await self._flush_pending_participants(broadcaster_id)
+
+            snapshot = (raffle.is_active, raffle.is_open)
+            if self._last_saved.get(broadcaster_id) == snapshot:
+                return
+
+            try:
+                data = raffle.to_db_format()
+                data["broadcaster_id"] = broadcaster_id
+
+                await asyncio.to_thread(
+                    lambda: self.supabase.table("raffles").upsert(
+                        data, on_conflict="broadcaster_id"
+                    ).execute()
+                )
+                self._last_saved[broadcaster_id] = snapshot
+                if _DEBUG:
+                    LOGGER.debug("Saved raffle state for broadcaster %s", broadcaster_id)
+            except Exception as e:
+                LOGGER.error("Failed to save raffle state: %s", e)
+
+    async def _flush_pending_participants(self, broadcaster_id: str) -> None:
+        """Snapshot participant rows queued behind the Redis write-through."""
+        rows = self._pending_rows.pop(broadcaster_id, None)
+        if not rows:
+            return
+
         try:
-            data = raffle.to_db_format()
-            data["broadcaster_id"] = broadcaster_id
-            
-            self.supabase.table("raffles").upsert(
-                data, on_conflict="broadcaster_id"
-            ).execute()
-            LOGGER.debug("Saved raffle state for broadcaster %s", broadcaster_id)
+            if self.pg_pool is not None:
+                await self.pg_pool.executemany(
+                    "INSERT INTO raffle_participants (broadcaster_id, user_id, display_name) "
+                    "VALUES ($1, $2, $3) ON CONFLICT (broadcaster_id, user_id) DO NOTHING",
+                    [(r["broadcaster_id"], r["user_id"], r["display_name"]) for r in rows],
+                )
+            else:
+                await asyncio.to_thread(
+                    lambda: self.supabase.table("raffle_participants").upsert(
+                        rows, on_conflict="broadcaster_id,user_id"
+                    ).execute()
+                )
+            if _DEBUG:
+                LOGGER.debug("Flushed %d participant(s) for broadcaster %s", len(rows), broadcaster_id)
         except Exception as e:
-            LOGGER.error("Failed to save raffle state: %s", e)
+            LOGGER.error("Failed to flush participants: %s", e)
+            # Re-queue so the next flush retries the snapshot.
+            self._pending_rows[broadcaster_id] = rows + self._pending_rows.get(broadcaster_id, [])
+
+    async def save_participant(self, broadcaster_id: str, user_id: str, display_name: str) -> None:
+        """Persist a single new participant row."""
+        if self.redis is not None:
+            try:
+                await self.redis.sadd(f"raffle:{broadcaster_id}:participants", user_id)
+                await self.redis.hset(f"raffle:{broadcaster_id}:names", user_id, display_name)
+            except Exception as e:
+                LOGGER.error("Failed to save participant to Redis: %s", e)
+
+            self._pending_rows.setdefault(broadcaster_id, []).append({
+                "broadcaster_id": broadcaster_id,
+                "user_id": user_id,
+                "display_name": display_name,
+            })
+            self._mark_dirty(broadcaster_id)
+            return
+
+        if self.pg_pool is not None:
+            try:
+                await self.pg_pool.execute(
+                    "INSERT INTO raffle_participants (broadcaster_id, user_id, display_name) "
+                    "VALUES ($1, $2, $3) ON CONFLICT (broadcaster_id, user_id) DO NOTHING",
+                    broadcaster_id, user_id, display_name,
+                )
+                if _DEBUG:
+                    LOGGER.debug("Saved participant %s for broadcaster %s", user_id, broadcaster_id)
+            except Exception as e:
+                LOGGER.error("Failed to save participant: %s", e)
+            return
 
-    async def delete_raffle(self, broadcaster_id: str) -> None:
-        """Delete raffle state from database."""
         try:
-            self.supabase.table("raffles").delete().eq(
-                "broadcaster_id", broadcaster_id
-            ).execute()
-            LOGGER.debug("Deleted raffle state for broadcaster %s", broadcaster_id)
+            await asyncio.to_thread(
+                lambda: self.supabase.table("raffle_participants").upsert({
+                    "broadcaster_id": broadcaster_id,
+                    "user_id": user_id,
+                    "display_name": display_name,
+                }, on_conflict="broadcaster_id,user_id").execute()
+            )
+            if _DEBUG:
+                LOGGER.debug("Saved participant %s for broadcaster %s", user_id, broadcaster_id)
         except Exception as e:
-            LOGGER.error("Failed to delete raffle state: %s", e)
+            LOGGER.error("Failed to save participant: %s", e)
 
-    def is_eligible(self, chatter: twitchio.Chatter) -> bool:
-        return chatter.vip or chatter.subscriber or chatter.moderator or chatter.broadcaster
+    async def delete_raffle(self, broadcaster_id: str) -> None:
+        """Delete raffle state from database."""
+        task = self._flush_tasks.pop(broadcaster_id, None)
+        if task is not None:
+            task.cancel()
+        self._dirty.pop(broadcaster_id, None)
+        self._elig_cache.pop(broadcaster_id, None)
+        self._last_saved.pop(broadcaster_id, None)
+        self._pending_rows.pop(broadcaster_id, None)
+
+        if self.redis is not None:
+            try:
+                await self.redis.delete(
+                    f"raffle:{broadcaster_id}",
+                    f"raffle:{broadcaster_id}:participants",
+                    f"raffle:{broadcaster_id}:names",
+                )
+            except Exception as e:
+                LOGGER.error("Failed to delete raffle state from Redis: %s", e)
+
+        async with self._save_locks[broadcaster_id]:
+            try:
+                await asyncio.to_thread(
+                    lambda: self.supabase.table("raffle_participants").delete().eq(
+                        "broadcaster_id", broadcaster_id
+                    ).execute()
+                )
+                await asyncio.to_thread(
+                    lambda: self.supabase.table("raffles").delete().eq(
+                        "broadcaster_id", broadcaster_id
+                    ).execute()
+                )
+                if _DEBUG:
+                    LOGGER.debug("Deleted raffle state for broadcaster %s", broadcaster_id)
+            except Exception as e:
+                LOGGER.error("Failed to delete raffle state: %s", e)
+
+        self._save_locks.pop(broadcaster_id, None)
+
+    def is_eligible(self, broadcaster_id: str, chatter: twitchio.Chatter) -> bool:
+        cache = self._elig_cache.setdefault(broadcaster_id, {})
+        eligible = cache.get(chatter.id)
+        if eligible is None:
+            eligible = bool(chatter.vip | chatter.subscriber | chatter.moderator | chatter.broadcaster)
+            cache[chatter.id] = eligible
+        return eligible
 
     def can_manage(self, chatter: twitchio.Chatter) -> bool:
         return chatter.moderator or chatter.broadcaster
@@ -136,33 +331,34 @@ class RaffleComponent(commands.Component):
         raffle.reset()
         raffle.is_active = True
         raffle.is_open = True
+        self._elig_cache.pop(ctx.broadcaster.id, None)
 
         await self.save_raffle(ctx.broadcaster.id)
-        await ctx.send("Raffle started! VIPs, Subscribers, and Moderators can type !enter to enter.")
+        await ctx.send(MSG_RAFFLE_STARTED)
 
     @commands.command(name="enter")
     async def join_raffle(self, ctx: commands.Context) -> None:
-        raffle = self.get_raffle(ctx.broadcaster.id)
-
-        if ctx.chatter.id == str(self.bot.bot_id):
+        if ctx.chatter.id == self._bot_id_str:
             return
 
-        if not raffle.is_active:
-            await ctx.reply("There is no raffle happening right now.")
+        # Don't materialize state for channels with no raffle running.
+        raffle = self.raffles.get(ctx.broadcaster.id)
+        if raffle is None or not raffle.is_active:
+            await ctx.reply(MSG_NO_RAFFLE)
             return
 
         if not raffle.is_open:
-            await ctx.reply("Raffle entries are closed.")
+            await ctx.reply(MSG_ENTRIES_CLOSED)
             return
 
-        if not self.is_eligible(ctx.chatter):
-            await ctx.reply("Only VIPs, Subscribers, and Moderators can join.")
+        if not self.is_eligible(ctx.broadcaster.id, ctx.chatter):
+            await ctx.reply(MSG_NOT_ELIGIBLE)
             return
 
         display_name = ctx.chatter.display_name or ctx.chatter.name
 
         if raffle.add_participant(ctx.chatter.id, display_name):
-            await self.save_raffle(ctx.broadcaster.id)
+            await self.save_participant(ctx.broadcaster.id, ctx.chatter.id, display_name)
         else:
             await ctx.reply(f"{display_name}, you have already joined.")
 
@@ -183,7 +379,7 @@ class RaffleComponent(commands.Component):
             return
 
         raffle.is_open = False
-        count = len(raffle.participants)
+        count = raffle.participant_count
 
         await self.save_raffle(ctx.broadcaster.id)
         await ctx.send(f"Entries closed. {count} participant{'s' if count != 1 else ''} entered.")
@@ -226,7 +422,7 @@ class RaffleComponent(commands.Component):
             await ctx.reply("There is no raffle to cancel.")
             return
 
-        count = len(raffle.participants)
+        count = raffle.participant_count
         raffle.reset()
 
         await self.delete_raffle(ctx.broadcaster.id)
@@ -234,17 +430,17 @@ class RaffleComponent(commands.Component):
 
     @commands.command(name="participants")
     async def show_participants(self, ctx: commands.Context) -> None:
-        raffle = self.get_raffle(ctx.broadcaster.id)
+        raffle = self.raffles.get(ctx.broadcaster.id)
 
-        if not raffle.is_active:
-            await ctx.reply("No raffle happening.")
+        if raffle is None or not raffle.is_active:
+            await ctx.reply(MSG_NO_RAFFLE_STATUS)
             return
 
-        count = len(raffle.participants)
+        count = raffle.participant_count
         status = "Open" if raffle.is_open else "Closed"
 
         await ctx.reply(f"Status: {status} | Participants: {count}")
 
     @commands.command(name="rafflehelp")
     async def raffle_help(self, ctx: commands.Context) -> None:
-        await ctx.send("Commands: !enter, !participants | Mods: !startraffle, !endraffle, !draw, !cancelraffle")
+        await ctx.send(MSG_HELP)